@@ -0,0 +1,166 @@
+from turbineengine import TripleSpoolNonMixingHighBypassTurbofanEngine
+from kernel import CompiledEngine
+from sweeps import SWEEP_PARAMETERS, evaluateSweep, toOutputs
+import kernel
+import numpy as np
+import argparse
+
+#   Adaptive Sweeps
+# A sweep starts from a coarse grid and only refines the intervals where the curve bends more
+# than a tolerance, or where the engine switches branch, e.g. when a nozzle chokes.
+# Branch changes are bisected down to the boundary instead of being smoothed over.
+
+# Known kinks of the model that are always sampled
+BREAKPOINTS = {"altitude": kernel.HEIGHTS}
+
+
+def refine(
+    function,
+    lower: float,
+    upper: float,
+    points=9,
+    tolerance=1e-3,
+    columns=None,
+    branch=None,
+    breakpoints=(),
+    minWidth=None,
+    boundaryTolerance=None,
+    maxEvaluations=10000,
+) -> tuple:
+    """
+    Samples function between lower and upper. function takes an array of x and returns one row of values per x.
+    An interval is split while the value at its midpoint is further than tolerance, relative to the range of
+    each of columns, from the straight line through its ends. branch maps rows to labels, and an interval whose
+    ends have different labels is bisected until it is narrower than boundaryTolerance. Intervals whose ends are
+    both NaN, e.g. where the engine cannot run, are not refined. At most maxEvaluations points are evaluated.
+    Returns (x, rows, boundaries, evaluations) with x sorted.
+    """
+    span = upper - lower
+    if minWidth is None:
+        minWidth = span * 1e-6
+    if boundaryTolerance is None:
+        boundaryTolerance = span * 1e-12
+    x = np.linspace(lower, upper, points)
+    x = np.unique(np.concatenate((x, [b for b in breakpoints if lower < b < upper])))
+    rows = np.asarray(function(x), dtype=float)
+    rows = rows.reshape(len(x), -1)
+    evaluations = len(x)
+    if columns is None:
+        columns = list(range(rows.shape[1]))
+    finite = rows[np.all(np.isfinite(rows[:, columns]), axis=1)][:, columns]
+    scale = np.ptp(finite, axis=0) if len(finite) else np.ones(len(columns))
+    scale[~(scale > 0)] = 1
+    samples = dict(zip(x.tolist(), rows))
+    labels = dict()
+    if branch is not None:
+        labels = dict(zip(x.tolist(), np.asarray(branch(rows)).tolist()))
+
+    boundaries = list()
+    pending = list(zip(x[:-1].tolist(), x[1:].tolist()))
+    while pending and evaluations < maxEvaluations:
+        pending = pending[: maxEvaluations - evaluations]
+        middles = [(a + b) / 2 for a, b in pending]
+        newRows = np.asarray(function(np.array(middles)), dtype=float)
+        newRows = newRows.reshape(len(middles), -1)
+        evaluations += len(middles)
+        samples.update(zip(middles, newRows))
+        if branch is not None:
+            labels.update(zip(middles, np.asarray(branch(newRows)).tolist()))
+
+        following = list()
+        for (a, b), m in zip(pending, middles):
+            if labels.get(a) != labels.get(b):
+                # Keep bisecting the half that holds the change, the other half is checked for curvature
+                if b - a <= boundaryTolerance or m <= a or m >= b:
+                    boundaries.append(m)
+                    continue
+                following.extend([(a, m), (m, b)])
+                continue
+            if b - a <= minWidth:
+                continue
+            if np.all(np.isnan(samples[a][columns])) and np.all(
+                np.isnan(samples[b][columns])
+            ):
+                continue
+            line = (samples[a][columns] + samples[b][columns]) / 2
+            error = np.abs(samples[m][columns] - line) / scale
+            if np.any(error > tolerance) or np.any(np.isnan(error)):
+                following.extend([(a, m), (m, b)])
+        pending = following
+
+    x = np.array(sorted(samples))
+    rows = np.array([samples[value] for value in x.tolist()])
+    return x, rows, np.array(sorted(boundaries)), evaluations
+
+
+def engineBranch(rows):
+    """
+    Labels every row of kernel outputs by which of the core and bypass nozzles are choked, and rows where the
+    engine cannot run by -1, so that the edge of the feasible region is bisected like a choke boundary.
+    """
+    labels = rows[:, kernel.CORE_CHOKED] * 2 + rows[:, kernel.BYPASS_CHOKED]
+    labels[np.isnan(rows[:, kernel.THRUST])] = -1
+    return labels
+
+
+def evaluateAdaptiveSweep(
+    parameter: str, lower: float, upper: float, tolerance=1e-3, points=9, backend=None
+) -> dict:
+    """
+    Evaluates a sweep of the turbofan adaptively, refining on thrust and TSFC and on nozzle choking.
+    Returns the same dictionary as evaluateSweep, plus the "boundaries" where a nozzle chokes or the engine stops
+    running, and the number of "evaluations".
+    """
+    compiled = CompiledEngine(TripleSpoolNonMixingHighBypassTurbofanEngine(), backend)
+
+    def function(values):
+        inlets, parameters = compiled.batch(len(values))
+        compiled.assign(inlets, parameters, *SWEEP_PARAMETERS[parameter], values)
+        return compiled.evaluate(inlets, parameters)
+
+    x, rows, boundaries, evaluations = refine(
+        function,
+        lower,
+        upper,
+        points,
+        tolerance,
+        columns=[kernel.THRUST, kernel.TSFC],
+        branch=engineBranch,
+        breakpoints=BREAKPOINTS.get(parameter, ()),
+    )
+    results = toOutputs(rows)
+    results[parameter] = x
+    results["boundaries"] = boundaries
+    results["evaluations"] = evaluations
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare an adaptive sweep with a uniform one."
+    )
+    parser.add_argument("parameter", choices=list(SWEEP_PARAMETERS))
+    parser.add_argument("lower", type=float)
+    parser.add_argument("upper", type=float)
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    parser.add_argument("--uniform", type=int, default=10000)
+    args = parser.parse_args()
+
+    adaptive = evaluateAdaptiveSweep(
+        args.parameter, args.lower, args.upper, args.tolerance
+    )
+    uniform = evaluateSweep(
+        args.parameter, np.linspace(args.lower, args.upper, args.uniform)
+    )
+    print("Adaptive evaluations: " + str(adaptive["evaluations"]))
+    print("Uniform evaluations: " + str(args.uniform))
+    print("Boundaries: " + str(adaptive["boundaries"].tolist()))
+    for output in ["thrust", "tsfc"]:
+        curve = np.interp(
+            uniform[args.parameter], adaptive[args.parameter], adaptive[output]
+        )
+        # Points where the engine cannot run are NaN in both and left out
+        error = np.nanmax(np.abs(curve - uniform[output])) / (
+            np.nanmax(uniform[output]) - np.nanmin(uniform[output])
+        )
+        print("Max " + output + " error relative to its range: " + format(error, ".3g"))
@@ -0,0 +1,271 @@
+from turbineengine import Compressor, NonMixingFan, Turbine
+import numpy as np
+from bisect import bisect_left
+import argparse
+import hashlib
+import json
+import os
+import time
+
+#   Component Maps
+# A map tabulates corrected flow, pressure ratio and efficiency against corrected speed lines and beta lines.
+# The bicubic spline coefficients of every cell are computed once per map and cached next to the map file,
+# then memory-mapped, so every process using the map shares the same pages and lookups are a polynomial
+# evaluation in the cell holding the point. The coefficients are stored cell by cell, so a lookup reads one
+# contiguous run of them.
+#
+# Maps are JSON files:
+# {"speeds": [...], "betas": [...], "correctedFlow": [[...]], "pressureRatio": [[...]], "efficiency": [[...]]}
+# with one row per speed line and one column per beta line.
+
+QUANTITIES = ["correctedFlow", "pressureRatio", "efficiency"]
+
+# Names the layout of cached coefficients, so caches written in another layout are not picked up
+LAYOUT = b"cells"
+
+# Points evaluated together by ComponentMap.evaluate
+BLOCK = 4096
+
+# Turns the values and derivatives at the corners of a cell into its polynomial coefficients
+HERMITE = np.array(
+    [
+        [1.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+        [-3.0, 3.0, -2.0, -1.0],
+        [2.0, -2.0, 1.0, 1.0],
+    ]
+)
+
+
+def validateMap(table: dict) -> None:
+    """
+    Checks that a map is a complete grid whose speed and beta lines are strictly increasing, whose pressure ratio
+    is strictly monotonic along every speed line, whose corrected flow does not fall as speed rises and whose
+    efficiency lies in (0, 1]. Raises ValueError otherwise.
+    """
+    speeds = np.asarray(table["speeds"], dtype=float)
+    betas = np.asarray(table["betas"], dtype=float)
+    if len(speeds) < 2 or len(betas) < 2:
+        raise ValueError("A map needs at least two speed lines and two beta lines")
+    if np.any(np.diff(speeds) <= 0) or np.any(np.diff(betas) <= 0):
+        raise ValueError("Speed and beta lines must be strictly increasing")
+    for quantity in QUANTITIES:
+        values = np.asarray(table[quantity], dtype=float)
+        if values.shape != (len(speeds), len(betas)):
+            raise ValueError(
+                quantity + " must have one row per speed and one column per beta"
+            )
+        if not np.all(np.isfinite(values)):
+            raise ValueError(quantity + " must be finite")
+    pressureRatio = np.asarray(table["pressureRatio"], dtype=float)
+    steps = np.sign(np.diff(pressureRatio, axis=1))
+    if np.any(steps == 0) or np.any(steps != steps[0, 0]):
+        raise ValueError(
+            "Pressure ratio must be strictly monotonic along every speed line"
+        )
+    if np.any(np.diff(np.asarray(table["correctedFlow"], dtype=float), axis=0) < 0):
+        raise ValueError("Corrected flow must not fall as corrected speed rises")
+    efficiency = np.asarray(table["efficiency"], dtype=float)
+    if np.any(efficiency <= 0) or np.any(efficiency > 1):
+        raise ValueError("Efficiency must lie in (0, 1]")
+
+
+def computeCoefficients(speeds, betas, values):
+    """
+    Returns the (speeds - 1, betas - 1, 4, 4) bicubic coefficients of values, with derivatives from finite
+    differences, so that a cell's value at local coordinates (u, v) is [1, u, u^2, u^3] A [1, v, v^2, v^3].
+    """
+    dSpeed = np.gradient(values, speeds, axis=0)
+    dBeta = np.gradient(values, betas, axis=1)
+    dBoth = np.gradient(dSpeed, betas, axis=1)
+    h = np.diff(speeds)[:, None]
+    k = np.diff(betas)[None, :]
+    corners = np.empty((len(speeds) - 1, len(betas) - 1, 4, 4))
+
+    def corner(table, i, j):
+        return table[i : table.shape[0] - 1 + i, j : table.shape[1] - 1 + j]
+
+    # Derivatives are scaled to the unit cell
+    for i in range(2):
+        for j in range(2):
+            corners[:, :, i, j] = corner(values, i, j)
+            corners[:, :, i, 2 + j] = corner(dBeta, i, j) * k
+            corners[:, :, 2 + i, j] = corner(dSpeed, i, j) * h
+            corners[:, :, 2 + i, 2 + j] = corner(dBoth, i, j) * h * k
+    return HERMITE @ corners @ HERMITE.T
+
+
+class ComponentMap:
+    """
+    An object that evaluates a component map from its precomputed spline coefficients.
+    """
+
+    def __init__(this, speeds, betas, coefficients) -> None:
+        """
+        coefficients -> (speeds - 1, betas - 1, len(QUANTITIES), 16), the flattened 4 x 4 matrices of
+        computeCoefficients of every quantity, cell by cell
+        """
+        this.speeds = np.asarray(speeds, dtype=float)
+        this.betas = np.asarray(betas, dtype=float)
+        this.coefficients = coefficients
+        # A plain view of the same pages, indexing a memmap is several times slower
+        this.flat = np.asarray(coefficients).reshape(-1)
+        this.cellSize = len(QUANTITIES) * 16
+        this.speedList = this.speeds.tolist()
+        this.betaList = this.betas.tolist()
+
+    def _locate(this, speed, beta):
+        i = np.clip(np.searchsorted(this.speeds, speed) - 1, 0, len(this.speeds) - 2)
+        j = np.clip(np.searchsorted(this.betas, beta) - 1, 0, len(this.betas) - 2)
+        u = (speed - this.speeds[i]) / (this.speeds[i + 1] - this.speeds[i])
+        v = (beta - this.betas[j]) / (this.betas[j + 1] - this.betas[j])
+        return i, j, u, v
+
+    def evaluate(this, speed, beta) -> dict:
+        """
+        Evaluates the map at arrays of corrected speed and beta. Points outside the map are extrapolated from the
+        nearest cell. Returns a dictionary of QUANTITIES -> arrays.
+        """
+        speed, beta = np.broadcast_arrays(
+            np.asarray(speed, dtype=float), np.asarray(beta, dtype=float)
+        )
+        speeds = speed.ravel()
+        betas = beta.ravel()
+        values = np.empty((len(speeds), len(QUANTITIES)))
+        # Blocks keep the gathered cells and the temporaries in cache
+        for start in range(0, len(speeds), BLOCK):
+            stop = start + BLOCK
+            i, j, u, v = this._locate(speeds[start:stop], betas[start:stop])
+            cells = this.flat.reshape(this.coefficients.shape)[i, j]
+            cells = cells.reshape(-1, len(QUANTITIES), 4, 4)
+            # Horner in v along every row of the matrices, then in u down the rows
+            v = v[:, None, None]
+            rows = cells[..., 3] * v
+            rows += cells[..., 2]
+            rows *= v
+            rows += cells[..., 1]
+            rows *= v
+            rows += cells[..., 0]
+            u = u[:, None]
+            block = rows[..., 3] * u
+            block += rows[..., 2]
+            block *= u
+            block += rows[..., 1]
+            block *= u
+            block += rows[..., 0]
+            values[start:stop] = block
+        return {
+            quantity: values[:, q].reshape(speed.shape)
+            for q, quantity in enumerate(QUANTITIES)
+        }
+
+    def lookup(this, speed: float, beta: float) -> tuple:
+        """
+        Evaluates the map at a single point in plain Python, which is much faster than NumPy for one point. Only the
+        coefficients of the cell holding the point are read from the shared memory map.
+        Returns (correctedFlow, pressureRatio, efficiency).
+        """
+        speeds = this.speedList
+        betas = this.betaList
+        i = min(max(bisect_left(speeds, speed) - 1, 0), len(speeds) - 2)
+        j = min(max(bisect_left(betas, beta) - 1, 0), len(betas) - 2)
+        u = (speed - speeds[i]) / (speeds[i + 1] - speeds[i])
+        v = (beta - betas[j]) / (betas[j + 1] - betas[j])
+        start = (i * (len(betas) - 1) + j) * this.cellSize
+        cell = this.flat[start : start + this.cellSize].tolist()
+        values = list()
+        for q in range(0, len(cell), 16):
+            # The matrix A of computeCoefficients, row by row
+            a = cell[q : q + 16]
+            r0 = ((a[3] * v + a[2]) * v + a[1]) * v + a[0]
+            r1 = ((a[7] * v + a[6]) * v + a[5]) * v + a[4]
+            r2 = ((a[11] * v + a[10]) * v + a[9]) * v + a[8]
+            r3 = ((a[15] * v + a[14]) * v + a[13]) * v + a[12]
+            values.append(((r3 * u + r2) * u + r1) * u + r0)
+        return tuple(values)
+
+
+def loadMap(path: str) -> ComponentMap:
+    """
+    Loads and validates a map file. Its coefficients are cached beside it, named after a hash of its contents, and
+    memory-mapped so that processes loading the same map share them.
+    """
+    with open(path, "rb") as file:
+        contents = file.read()
+    table = json.loads(contents)
+    validateMap(table)
+    digest = hashlib.sha256(LAYOUT + contents).hexdigest()[:16]
+    cache = path + "." + digest + ".npy"
+    if not os.path.exists(cache):
+        speeds = np.asarray(table["speeds"], dtype=float)
+        betas = np.asarray(table["betas"], dtype=float)
+        coefficients = np.stack(
+            [
+                computeCoefficients(
+                    speeds, betas, np.asarray(table[quantity], dtype=float)
+                )
+                for quantity in QUANTITIES
+            ],
+            axis=2,
+        ).reshape(len(speeds) - 1, len(betas) - 1, len(QUANTITIES), 16)
+        # Write under a temporary name so other processes never load half a file
+        temporary = cache + "." + str(os.getpid()) + ".tmp"
+        with open(temporary, "wb") as file:
+            np.save(file, coefficients)
+        os.replace(temporary, cache)
+    return ComponentMap(table["speeds"], table["betas"], np.load(cache, mmap_mode="r"))
+
+
+def applyMap(component, componentMap: ComponentMap, speed: float, beta: float):
+    """
+    Sets the efficiency, and for a Compressor or NonMixingFan the pressure ratio, of component from its map at
+    corrected speed and beta. A Turbine's pressure ratio follows from the work it supplies, so only its efficiency
+    is taken from the map. Returns the corrected flow of the map at that point.
+    """
+    correctedFlow, pressureRatio, efficiency = componentMap.lookup(speed, beta)
+    component.efficiency = efficiency
+    if isinstance(component, (Compressor, NonMixingFan)):
+        component.pressureRatio = pressureRatio
+    elif not isinstance(component, Turbine):
+        raise TypeError("A " + type(component).__name__ + " has no map")
+    return correctedFlow
+
+
+def applyMapToBatch(
+    compiled, parameters, component, componentMap: ComponentMap, speed, beta
+):
+    """
+    The batch form of applyMap, writing into the parameters of a CompiledEngine batch, see CompiledEngine.batch.
+    Returns the corrected flow of every point.
+    """
+    values = componentMap.evaluate(speed, beta)
+    compiled.assign(None, parameters, component, "efficiency", values["efficiency"])
+    k = compiled.parameterIndex(component, "efficiency")[0]
+    if not isinstance(compiled.components[k], Turbine):
+        compiled.assign(
+            None, parameters, component, "pressureRatio", values["pressureRatio"]
+        )
+    return values["correctedFlow"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate a map and time its lookups.")
+    parser.add_argument("path")
+    parser.add_argument("--points", type=int, default=100000)
+    args = parser.parse_args()
+
+    componentMap = loadMap(args.path)
+    random = np.random.default_rng(0)
+    speeds = random.uniform(
+        componentMap.speeds[0], componentMap.speeds[-1], args.points
+    )
+    betas = random.uniform(componentMap.betas[0], componentMap.betas[-1], args.points)
+    start = time.perf_counter()
+    componentMap.evaluate(speeds, betas)
+    batch = (time.perf_counter() - start) / args.points
+    start = time.perf_counter()
+    for speed, beta in zip(speeds[:10000].tolist(), betas[:10000].tolist()):
+        componentMap.lookup(speed, beta)
+    single = (time.perf_counter() - start) / min(args.points, 10000)
+    print("Batch: " + format(batch * 1e9, ".3g") + " ns per point")
+    print("Single: " + format(single * 1e9, ".3g") + " ns per lookup")
@@ -0,0 +1,129 @@
+from turbineengine import *
+from kernel import BATCH_KERNELS, OUTPUTS, CompiledEngine, defaultBackend
+import kernel
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import argparse
+import time
+
+#   Fleet Evaluation
+# Engines with different component chains are grouped by topology, i.e. the sequence of component types and
+# which component each turbine powers. Every group is stacked into one batch for the compiled kernel, the
+# groups run concurrently, and the results are put back in the order the engines were given.
+
+
+def _evaluateGroup(operations, targets, inlets, parameters, backend: str):
+    """
+    Runs one homogeneous batch through the kernel of backend.
+    """
+    out = np.empty((inlets.shape[0], OUTPUTS))
+    work = np.zeros(len(operations))
+    BATCH_KERNELS[backend](operations, targets, inlets, parameters, work, out)
+    return out
+
+
+def groupByTopology(compiledEngines: list) -> dict:
+    """
+    Returns a dictionary of topology signature -> indices of the engines that share it, in input order.
+    """
+    groups = dict()
+    for i, compiled in enumerate(compiledEngines):
+        groups.setdefault(compiled.signature, list()).append(i)
+    return groups
+
+
+def evaluateFleet(engines: list, workers=None, backend=None):
+    """
+    Simulates every engine of a fleet, each at the operating point of its own fluid. engines may be TurbineEngine
+    objects, wrappers such as TripleSpoolNonMixingHighBypassTurbofanEngine, or CompiledEngine objects.
+    The Numba kernels release the GIL, so groups run on threads, while plain Python groups run in processes.
+    Returns an (engines, kernel.OUTPUTS) array in the order of engines.
+    """
+    if backend is None:
+        backend = defaultBackend()
+    compiledEngines = [
+        engine
+        if isinstance(engine, CompiledEngine)
+        else CompiledEngine(engine, backend)
+        for engine in engines
+    ]
+    groups = groupByTopology(compiledEngines)
+    executor = ThreadPoolExecutor if backend == "numba" else ProcessPoolExecutor
+    out = np.empty((len(compiledEngines), OUTPUTS))
+    with executor(workers) as pool:
+        futures = dict()
+        for signature, indices in groups.items():
+            first = compiledEngines[indices[0]]
+            inlets = np.stack([compiledEngines[i].inlet for i in indices])
+            parameters = np.stack([compiledEngines[i].parameters for i in indices])
+            futures[signature] = pool.submit(
+                _evaluateGroup,
+                first.operations,
+                first.targets,
+                inlets,
+                parameters,
+                backend,
+            )
+        for signature, indices in groups.items():
+            out[indices] = futures[signature].result()
+    return out
+
+
+def buildTurbojet(
+    compressorPressureRatio=5, totalExitTemperature=1300, mach=0.85, altitude=0
+) -> TurbineEngine:
+    """
+    Builds the small, single-spool turbojet engine of EnginePerformance.py.
+    """
+    fluid = Fluid(mach, 1.4, 1.333, 1005, 1150, altitude, 5.8)
+    compressor = Compressor(0.78, compressorPressureRatio)
+    combustionChamber = CombustionChamber(
+        0.98, 5.5 / 100, totalExitTemperature, 43.1 * 10 ** 6
+    )
+    turbine = Turbine(0.86, compressor)
+    engineComponents = list(
+        [
+            Intake(),
+            compressor,
+            combustionChamber,
+            turbine,
+            JetPipe(),
+            ConvergentNozzle(3.5 / 100),
+        ]
+    )
+    return TurbineEngine(fluid, engineComponents)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time a mixed fleet against the object model."
+    )
+    parser.add_argument("--engines", type=int, default=20000)
+    args = parser.parse_args()
+
+    # A fleet of turbojets and turbofans at random operating points
+    random = np.random.default_rng(0)
+    engines = list()
+    for i in range(args.engines):
+        mach = random.uniform(0.5, 0.9)
+        altitude = random.uniform(0, 12000)
+        if i % 2:
+            engines.append(buildTurbojet(random.uniform(3, 8), 1300, mach, altitude))
+        else:
+            engines.append(
+                TripleSpoolNonMixingHighBypassTurbofanEngine(
+                    random.uniform(4, 8), mach, altitude
+                )
+            )
+    evaluateFleet(engines[:2])
+
+    start = time.perf_counter()
+    out = evaluateFleet(engines)
+    fleetTime = time.perf_counter() - start
+    start = time.perf_counter()
+    thrusts = [engine.simulate().thrust for engine in engines]
+    scalarTime = time.perf_counter() - start
+    error = np.max(np.abs(out[:, kernel.THRUST] - thrusts) / np.abs(thrusts))
+    print("Fleet: " + format(fleetTime, ".3g") + " s")
+    print("One at a time: " + format(scalarTime, ".3g") + " s")
+    print("Max relative thrust error: " + format(error, ".3g"))
@@ -0,0 +1,400 @@
+from turbineengine import TripleSpoolNonMixingHighBypassTurbofanEngine
+from kernel import CompiledEngine
+import kernel
+import numpy as np
+import argparse
+import time
+
+#   Thrust Targeting
+# Finds the turbine inlet temperature, and with it the fuel flow, that gives a target thrust at many
+# operating points at once. Every iteration is one batched call of the compiled kernel for the points
+# that have not converged yet.
+
+
+def _risingBranch(
+    compiled, inlets, parameters, slot, lower, upper, points=17, iterations=30
+):
+    """
+    Returns the lowest temperature of every row in [lower, upper] above which thrust is finite and rises with the
+    temperature. Below it the turbine cannot supply its work, or thrust falls as the temperature rises, so neither
+    end of a bracket may lie there. A coarse scan finds where the final rising run starts, then a golden section
+    search finds the thrust minimum next to it, counting points where the engine cannot run as infinite thrust.
+    Returns (lower, evaluations), evaluations being the number of kernel evaluations spent on each row.
+    """
+    count = len(lower)
+    k, s = slot
+    everything = np.arange(count)
+    grid = lower[:, None] + (upper - lower)[:, None] * np.linspace(0, 1, points)
+    scan = np.repeat(parameters, points, axis=0)
+    scan[:, k, s] = grid.ravel()
+    thrust = compiled.evaluate(np.repeat(inlets, points, axis=0), scan)
+    thrust = thrust[:, kernel.THRUST].reshape(count, points)
+    falling = ~(thrust[:, 1:] > thrust[:, :-1])
+    start = np.where(
+        falling.any(axis=1), points - 1 - np.argmax(falling[:, ::-1], axis=1), 0
+    )
+    search = parameters.copy()
+
+    def thrustAt(x):
+        search[:, k, s] = x
+        f = compiled.evaluate(inlets, search)[:, kernel.THRUST]
+        return np.where(np.isnan(f), np.inf, f)
+
+    # The minimum lies within a sample of the start, even when the scan rises from its first sample
+    ratio = (np.sqrt(5) - 1) / 2
+    a = grid[everything, np.maximum(start - 1, 0)]
+    b = grid[everything, np.minimum(start + 1, points - 1)]
+    c = b - ratio * (b - a)
+    d = a + ratio * (b - a)
+    fC = thrustAt(c)
+    fD = thrustAt(d)
+    for i in range(iterations):
+        left = fC < fD
+        a = np.where(left, a, c)
+        b = np.where(left, d, b)
+        x = np.where(left, b - ratio * (b - a), a + ratio * (b - a))
+        fX = thrustAt(x)
+        c, d = np.where(left, x, d), np.where(left, c, x)
+        fC, fD = np.where(left, fX, fD), np.where(left, fC, fX)
+    x = np.where(fC < fD, c, d)
+    lower = np.where(np.isinf(np.minimum(fC, fD)), grid[everything, start], x)
+    return lower, points + 2 + iterations
+
+
+def _evaluate(compiled, inlets, parameters, slot, x):
+    """
+    Returns the thrust of every row at temperatures x, and which of its nozzles are choked as in adaptive.engineBranch.
+    """
+    parameters[:, slot[0], slot[1]] = x
+    out = compiled.evaluate(inlets, parameters)
+    return (
+        out[:, kernel.THRUST],
+        out[:, kernel.CORE_CHOKED] * 2 + out[:, kernel.BYPASS_CHOKED],
+    )
+
+
+def _localBracket(
+    compiled, inlets, parameters, slot, target, guess, lower, upper, expansions=3
+):
+    """
+    Brackets the target of every row next to guess, stepping from it towards the target and widening the step up to
+    expansions times. A row is bracketed once its two ends straddle the target and thrust rises from the lower end
+    to the upper one, which puts the root on the rising branch. Returns (found, evaluations, lo, hi, fLo, fHi,
+    branchLo, branchHi) with the kernel evaluations spent on each row and the thrust errors and branches at the ends.
+    """
+    count = len(target)
+    x0 = np.clip(guess, lower, upper)
+    f0, branch0 = _evaluate(compiled, inlets, parameters, slot, x0)
+    f0 = f0 - target
+    direction = np.where(f0 < 0, 1.0, -1.0)
+    width = (upper - lower) / 256
+    x1 = x0.copy()
+    f1 = np.full(count, np.nan)
+    branch1 = branch0.copy()
+    found = np.zeros(count, dtype=bool)
+    evaluations = np.ones(count, dtype=int)
+    rows = np.flatnonzero(np.isfinite(f0))
+    for i in range(expansions + 1):
+        if len(rows) == 0:
+            break
+        x = np.clip(
+            x0[rows] + direction[rows] * width[rows] * 4 ** i, lower[rows], upper[rows]
+        )
+        f, branch = _evaluate(compiled, inlets[rows], parameters[rows], slot, x)
+        f = f - target[rows]
+        evaluations[rows] += 1
+        x1[rows], f1[rows], branch1[rows] = x, f, branch
+        rising = (f - f0[rows]) * direction[rows] > 0
+        straddles = f0[rows] * f <= 0
+        found[rows[rising & straddles]] = True
+        # Keep widening where thrust rises towards the target but has not reached it within the bounds
+        rows = rows[rising & ~straddles & (x != lower[rows]) & (x != upper[rows])]
+
+    up = direction > 0
+    return (
+        found,
+        evaluations,
+        np.where(up, x0, x1),
+        np.where(up, x1, x0),
+        np.where(up, f0, f1),
+        np.where(up, f1, f0),
+        np.where(up, branch0, branch1),
+        np.where(up, branch1, branch0),
+    )
+
+
+def _bracket(compiled, inlets, parameters, slot, target, guess, lower, upper):
+    """
+    Brackets the target of every row on the rising branch, next to guess where it is given and that works, and
+    otherwise between the thrust minimum found by _risingBranch and upper.
+    Returns ((lo, hi, fLo, fHi, branchLo, branchHi), evaluations) as _localBracket.
+    """
+    count = len(target)
+    found = np.zeros(count, dtype=bool)
+    lo, hi = lower.copy(), upper.copy()
+    fLo, fHi = np.full(count, np.nan), np.full(count, np.nan)
+    branchLo, branchHi = np.zeros(count), np.zeros(count)
+    evaluations = np.zeros(count, dtype=int)
+    rows = np.flatnonzero(~np.isnan(guess))
+    if len(rows):
+        local = _localBracket(
+            compiled,
+            inlets[rows],
+            parameters[rows],
+            slot,
+            target[rows],
+            guess[rows],
+            lower[rows],
+            upper[rows],
+        )
+        found[rows] = local[0]
+        evaluations[rows] = local[1]
+        for values, ends in zip(local[2:], (lo, hi, fLo, fHi, branchLo, branchHi)):
+            ends[rows] = np.where(local[0], values, ends[rows])
+
+    rows = np.flatnonzero(~found)
+    if len(rows):
+        lo[rows], scanned = _risingBranch(
+            compiled, inlets[rows], parameters[rows], slot, lower[rows], upper[rows]
+        )
+        evaluations[rows] += scanned + 2
+        fLo[rows], branchLo[rows] = _evaluate(
+            compiled, inlets[rows], parameters[rows], slot, lo[rows]
+        )
+        fHi[rows], branchHi[rows] = _evaluate(
+            compiled, inlets[rows], parameters[rows], slot, hi[rows]
+        )
+        fLo[rows] -= target[rows]
+        fHi[rows] -= target[rows]
+    return (lo, hi, fLo, fHi, branchLo, branchHi), evaluations
+
+
+def _secant(
+    compiled,
+    inlets,
+    parameters,
+    slot,
+    target,
+    bracket,
+    guess,
+    tolerance,
+    maxIterations,
+):
+    """
+    Solves thrust(x) = target for every row with a secant step kept inside its bracket, see _bracket, falling back to
+    bisection when the step leaves it. While the nozzles are choked differently at the two ends of the bracket the
+    target may sit in the thrust jump where they choke, which a secant step only creeps up on from one side, so the
+    bracket is bisected until both ends are on the same branch or it has collapsed. Returns (x, iterations, converged).
+    """
+    count = len(target)
+
+    def thrustError(rows, x):
+        f, branch = _evaluate(compiled, inlets[rows], parameters[rows], slot, x)
+        return f - target[rows], branch
+
+    lo, hi, fLo, fHi, branchLo, branchHi = (ends.copy() for ends in bracket)
+    # Bracket so that fLo is always below the target
+    swap = fLo > fHi
+    lo[swap], hi[swap] = hi[swap], lo[swap]
+    fLo[swap], fHi[swap] = fHi[swap], fLo[swap]
+    branchLo[swap], branchHi[swap] = branchHi[swap], branchLo[swap]
+    feasible = (fLo <= 0) & (fHi >= 0)
+
+    x = np.where(np.isnan(guess), lo - fLo * (hi - lo) / (fHi - fLo), guess)
+    x = np.where((x - lo) * (x - hi) < 0, x, (lo + hi) / 2)
+    xPrevious = lo.copy()
+    fPrevious = fLo.copy()
+    iterations = np.zeros(count, dtype=int)
+    converged = np.zeros(count, dtype=bool)
+    active = np.flatnonzero(feasible)
+    scale = np.maximum(np.abs(target), 1)
+    while len(active) and iterations[active].max() < maxIterations:
+        f, branch = thrustError(active, x[active])
+        iterations[active] += 1
+        below = f < 0
+        lo[active[below]] = x[active[below]]
+        fLo[active[below]] = f[below]
+        branchLo[active[below]] = branch[below]
+        hi[active[~below]] = x[active[~below]]
+        fHi[active[~below]] = f[~below]
+        branchHi[active[~below]] = branch[~below]
+        # A collapsed bracket without a root means the target sits in a jump of the thrust
+        hit = np.abs(f) <= tolerance * scale[active]
+        done = hit | (np.abs(hi[active] - lo[active]) <= tolerance * np.abs(x[active]))
+        converged[active[hit]] = True
+
+        step = x[active] - f * (x[active] - xPrevious[active]) / (f - fPrevious[active])
+        inside = (step - lo[active]) * (step - hi[active]) < 0
+        inside &= branchLo[active] == branchHi[active]
+        xPrevious[active] = x[active]
+        fPrevious[active] = f
+        x[active] = np.where(inside, step, (lo[active] + hi[active]) / 2)
+        active = active[~done]
+
+    x = np.where(converged, xPrevious, np.nan)
+    return x, iterations, converged
+
+
+def solveTurbineInletTemperature(
+    engine,
+    targetThrust,
+    mach,
+    altitude,
+    bounds=(1000.0, 2500.0),
+    guess=None,
+    tolerance=1e-9,
+    maxIterations=50,
+    stride=8,
+    backend=None,
+) -> dict:
+    """
+    targetThrust -> N | mach -> unitless | altitude -> m | bounds -> K | guess -> K
+    Finds the combustion chamber totalExitTemperature that gives targetThrust at every operating point. The inputs
+    are broadcast together. Every stride-th point is solved first and the rest start from the solution of their
+    neighbours, unless a guess is given, e.g. the solution of the previous step of a mission. Points with a starting
+    value are bracketed next to it, and only those where that fails scan the whole of bounds.
+    Returns a dictionary of arrays: "turbineInletTemperature", "fuelFlow", "thrust", "iterations", "evaluations" and
+    "feasible". "iterations" counts the steps of the secant solve, while "evaluations" counts every kernel evaluation
+    spent on the point, including bracketing it and evaluating the solution.
+    Thrust falls as the temperature rises at the low end of the range, and the engine cannot run at all below some
+    temperature, so solutions are only sought above the thrust minimum, where thrust rises with the temperature.
+    Points whose target cannot be reached there within bounds, or falls in the thrust jump where the core nozzle
+    chokes, are not feasible and get NaN.
+    """
+    if not isinstance(engine, CompiledEngine):
+        engine = CompiledEngine(engine, backend)
+    targetThrust, mach, altitude = np.broadcast_arrays(
+        np.asarray(targetThrust, dtype=float),
+        np.asarray(mach, dtype=float),
+        np.asarray(altitude, dtype=float),
+    )
+    shape = targetThrust.shape
+    target = targetThrust.ravel()
+    count = len(target)
+    inlets, parameters = engine.batch(count)
+    inlets[:, kernel.MACH_NUMBER] = mach.ravel()
+    inlets[:, kernel.ALTITUDE] = altitude.ravel()
+    combustor = list(engine.operations).index(kernel.COMBUSTOR)
+    slot = engine.parameterIndex(combustor, "totalExitTemperature")
+    lower = np.full(count, float(bounds[0]))
+    upper = np.full(count, float(bounds[1]))
+
+    solution = np.full(count, np.nan)
+    iterations = np.zeros(count, dtype=int)
+    evaluations = np.zeros(count, dtype=int)
+    feasible = np.zeros(count, dtype=bool)
+    if guess is None:
+        # Solve the seed points, then warm start the rest by interpolating between them
+        seeds = np.unique(np.append(np.arange(0, count, stride), count - 1))
+        passes = [
+            (seeds, np.full(len(seeds), np.nan)),
+            (np.setdiff1d(np.arange(count), seeds), None),
+        ]
+    else:
+        guess = np.broadcast_to(np.asarray(guess, dtype=float), shape).ravel()
+        passes = [(np.arange(count), guess)]
+    for rows, start in passes:
+        if len(rows) == 0:
+            continue
+        if start is None:
+            solved = np.flatnonzero(~np.isnan(solution))
+            start = np.full(len(rows), np.nan)
+            if len(solved):
+                start = np.interp(rows, solved, solution[solved])
+        # Flat secant steps and unreachable points give NaN, which the bracket handles
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bracket, bracketing = _bracket(
+                engine,
+                inlets[rows],
+                parameters[rows],
+                slot,
+                target[rows],
+                start,
+                lower[rows],
+                upper[rows],
+            )
+            x, n, converged = _secant(
+                engine,
+                inlets[rows],
+                parameters[rows],
+                slot,
+                target[rows],
+                bracket,
+                start,
+                tolerance,
+                maxIterations,
+            )
+        solution[rows] = x
+        iterations[rows] = n
+        evaluations[rows] = bracketing + n
+        feasible[rows] = converged
+
+    parameters[:, slot[0], slot[1]] = np.where(np.isnan(solution), bounds[0], solution)
+    out = engine.evaluate(inlets, parameters)
+    evaluations += 1
+    thrust = np.where(np.isnan(solution), np.nan, out[:, kernel.THRUST])
+    fuelFlow = np.where(np.isnan(solution), np.nan, out[:, kernel.FUEL_FLOW])
+    return {
+        "turbineInletTemperature": solution.reshape(shape),
+        "fuelFlow": fuelFlow.reshape(shape),
+        "thrust": thrust.reshape(shape),
+        "iterations": iterations.reshape(shape),
+        "evaluations": evaluations.reshape(shape),
+        "feasible": feasible.reshape(shape),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Solve the turbofan TIT for a target thrust over altitude."
+    )
+    parser.add_argument("thrust", type=float, help="target thrust (kN)")
+    parser.add_argument("--mach", type=float, default=0.84)
+    parser.add_argument("--points", type=int, default=1000)
+    args = parser.parse_args()
+
+    compiled = CompiledEngine(TripleSpoolNonMixingHighBypassTurbofanEngine())
+    altitudes = np.linspace(0, 15000, args.points)
+    solveTurbineInletTemperature(compiled, args.thrust * 1000, args.mach, altitudes[:2])
+    start = time.perf_counter()
+    result = solveTurbineInletTemperature(
+        compiled, args.thrust * 1000, args.mach, altitudes
+    )
+    elapsed = time.perf_counter() - start
+    print("Solved " + str(args.points) + " points in " + format(elapsed, ".3g") + " s")
+    print("Feasible: " + str(int(result["feasible"].sum())))
+    print("Mean iterations: " + format(result["iterations"].mean(), ".3g"))
+    print("Mean kernel evaluations: " + format(result["evaluations"].mean(), ".3g"))
+    print(
+        "TIT (K): "
+        + format(np.nanmin(result["turbineInletTemperature"]), ".1f")
+        + " to "
+        + format(np.nanmax(result["turbineInletTemperature"]), ".1f")
+    )
+
+    # Check against a dense scan: a target is reachable where two neighbouring samples above the thrust minimum,
+    # with the same nozzles choked, straddle it
+    temperatures = np.linspace(1000, 2500, 301)
+    inlets, parameters = compiled.batch(args.points * len(temperatures))
+    inlets[:, kernel.MACH_NUMBER] = args.mach
+    inlets[:, kernel.ALTITUDE] = np.repeat(altitudes, len(temperatures))
+    combustor = list(compiled.operations).index(kernel.COMBUSTOR)
+    k, s = compiled.parameterIndex(combustor, "totalExitTemperature")
+    parameters[:, k, s] = np.tile(temperatures, args.points)
+    out = compiled.evaluate(inlets, parameters).reshape(
+        args.points, len(temperatures), -1
+    )
+    thrust = out[:, :, kernel.THRUST]
+    branch = out[:, :, kernel.CORE_CHOKED] * 2 + out[:, :, kernel.BYPASS_CHOKED]
+    rising = (
+        np.arange(len(temperatures) - 1)
+        >= np.argmin(np.where(np.isnan(thrust), np.inf, thrust), axis=1)[:, None]
+    )
+    straddles = (thrust[:, :-1] - args.thrust * 1000) * (
+        thrust[:, 1:] - args.thrust * 1000
+    ) <= 0
+    reachable = np.any(straddles & rising & (branch[:, :-1] == branch[:, 1:]), axis=1)
+    print(
+        "Reachable in a dense scan but not solved: "
+        + str(int(np.sum(reachable & ~result["feasible"])))
+    )
@@ -0,0 +1,408 @@
+from turbineengine import (
+    Intake,
+    NonMixingFan,
+    Compressor,
+    CombustionChamber,
+    Turbine,
+    JetPipe,
+    ConvergentNozzle,
+)
+import numpy as np
+import argparse
+import math
+import time
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+#   Compiled Engine Kernel
+# A TurbineEngine is lowered to flat arrays of operation codes and parameters so that the
+# per-point math runs without any Python objects. The same kernel source runs as plain
+# Python, or is JIT-compiled with Numba when it is installed.
+
+# Operation codes, one per component
+PASS = 0
+FAN = 1
+COMPRESSOR = 2
+COMBUSTOR = 3
+TURBINE = 4
+NOZZLE = 5
+
+# The parameter slots of every component type, in the order of its constructor
+OPERATIONS = {
+    Intake: (PASS, []),
+    JetPipe: (PASS, []),
+    NonMixingFan: (
+        FAN,
+        ["efficiency", "pressureRatio", "bypassRatio", "bypassDuctTotalPressureLoss"],
+    ),
+    Compressor: (COMPRESSOR, ["efficiency", "pressureRatio"]),
+    CombustionChamber: (
+        COMBUSTOR,
+        [
+            "efficiency",
+            "totalPressureLoss",
+            "totalExitTemperature",
+            "fuelLowerHeatingValue",
+        ],
+    ),
+    Turbine: (TURBINE, ["efficiency"]),
+    ConvergentNozzle: (NOZZLE, ["totalPressureLoss"]),
+}
+SLOTS = 4
+
+# The inlet columns, in the order of the Fluid constructor
+INLETS = [
+    "machNumber",
+    "gammaCold",
+    "gammaHot",
+    "cpCold",
+    "cpHot",
+    "altitude",
+    "massFlowRate",
+]
+MACH_NUMBER = 0
+GAMMA_COLD = 1
+GAMMA_HOT = 2
+CP_COLD = 3
+CP_HOT = 4
+ALTITUDE = 5
+MASS_FLOW_RATE = 6
+
+# The output columns
+THRUST = 0
+FUEL_FLOW = 1
+TSFC = 2
+CORE_MOMENTUM_THRUST = 3
+CORE_PRESSURE_THRUST = 4
+BYPASS_THRUST = 5
+CORE_PRESSURE_RATIO = 6
+BYPASS_PRESSURE_RATIO = 7
+CORE_CHOKED = 8
+BYPASS_CHOKED = 9
+OUTPUTS = 10
+
+# The metric US Standard Atmosphere layers of findStandardAtmosphere
+HEIGHTS = (0.0, 11000.0, 25000.0, 47000.0, 53000.0, 79000.0, 90000.0, 105000.0)
+SLOPES = (-0.0065, 0.0, 0.003, 0.0, -0.0045, 0.0, 0.004, 0.004)
+
+
+def _evaluatePoint(operations, targets, inlet, parameters, work, out):
+    """
+    Simulates one operating point. Mirrors Fluid and every component's simulate operation for operation, so the
+    Python backend is bit-for-bit identical to TurbineEngine.simulate wherever that succeeds. Where a turbine cannot
+    supply the work it is asked for, the object model fails while both backends write NaN. Results are written into
+    out.
+    """
+    mach0 = inlet[MACH_NUMBER]
+    gc = inlet[GAMMA_COLD]
+    gh = inlet[GAMMA_HOT]
+    cpc = inlet[CP_COLD]
+    cph = inlet[CP_HOT]
+    h = inlet[ALTITUDE]
+    mdot = inlet[MASS_FLOW_RATE]
+
+    # Standard atmosphere, as findStandardAtmosphere
+    pAtm = 101325.0
+    tAtm = 288.16
+    t0 = 288.16
+    if h < 0.0:
+        pAtm = math.nan
+    index = 0
+    while index < len(HEIGHTS) and HEIGHTS[index] <= h:
+        index += 1
+    for i in range(index):
+        if i == index - 1:
+            dh = h - HEIGHTS[i]
+        else:
+            dh = HEIGHTS[i + 1] - HEIGHTS[i]
+        if SLOPES[i] != 0.0:
+            tAtm = t0 + SLOPES[i] * dh
+            pAtm = pAtm * (tAtm / t0) ** (-9.81 / (SLOPES[i] * 287))
+            t0 = tAtm
+        else:
+            pAtm = pAtm * math.exp((-9.81 / (287 * tAtm)) * dh)
+
+    # Working fluid, as Fluid
+    ratio = 1.0 + ((1.4 - 1.0) / 2.0) * mach0 ** 2.0
+    ptAtm = pAtm * ratio ** (1.4 / (1.4 - 1.0))
+    pt = ptAtm
+    tt = tAtm * ratio
+    rc = cpc * (gc - 1) / gc
+    rh = cph * (gh - 1) / gh
+    v0 = mach0 * (gc * rc * tAtm) ** 0.5
+    mFuel = 0.0
+    mBypass = 0.0
+    thrust = 0.0
+    coreMomentum = 0.0
+    corePressure = 0.0
+    bypassRatio = math.nan
+    coreChoked = 0.0
+    bypassChoked = 0.0
+
+    for k in range(len(operations)):
+        operation = operations[k]
+        p = parameters[k]
+        if operation == FAN or operation == COMPRESSOR:
+            pOut = pt * p[1]
+            tOutIdeal = tt * (p[1]) ** ((gc - 1) / gc)
+            wIdeal = mdot * cpc * (tOutIdeal - tt)
+            work[k] = wIdeal / p[0]
+            tOut = tt + work[k] / (mdot * cpc)
+            pt = pOut
+            tt = tOut
+            if operation == FAN:
+                mdot = mdot / (1 + p[2])
+                mBypass = mdot * p[2]
+                ptBypass = pt * (1 - p[3])
+                pRatioCritical = (1 + (gc - 1) / 2) ** (gc / (gc - 1))
+                mach = 1.0
+                bypassChoked = 1.0
+                if ptBypass / pAtm <= pRatioCritical:
+                    ptBypass = ptAtm
+                    mach = (
+                        2 / (gc - 1) * ((ptBypass / pAtm) ** ((gc - 1) / gc) - 1)
+                    ) ** (1 / 2)
+                    bypassChoked = 0.0
+                pBypass = ptBypass / ((1 + (gc - 1) / 2 * mach ** 2) ** (gc / (gc - 1)))
+                tBypass = tt / (1 + (gc - 1) / 2 * mach ** 2)
+                vBypass = mach * (gc * rc * tBypass) ** (1 / 2)
+                density = pBypass / (rc * tBypass)
+                area = mBypass / (density * vBypass)
+                thrust += mBypass * (vBypass - v0) + area * (pBypass - pAtm)
+                bypassRatio = ptBypass / pAtm
+        elif operation == COMBUSTOR:
+            m = mdot * cph * (p[2] - tt) / (p[0] * p[3] + cph * (p[2] - tt))
+            mdot += m
+            mFuel = m
+            tt = p[2]
+            pt = pt * (1 - p[1])
+        elif operation == TURBINE:
+            tOut = tt - work[targets[k]] / (mdot * cph)
+            tSOut = tt - (tt - tOut) / p[0]
+            if tSOut < 0.0:
+                # The turbine cannot supply the work, plain Python would carry on with complex numbers
+                tSOut = math.nan
+            pt = pt * (tSOut / tt) ** (gh / (gh - 1))
+            tt = tOut
+        elif operation == NOZZLE:
+            pRatioCritical = (1 + (gh - 1) / 2) ** (gh / (gh - 1))
+            pOut = pt * (1 - p[0])
+            mach = 1.0
+            coreChoked = 1.0
+            if pOut / pAtm <= pRatioCritical:
+                pOut = ptAtm
+                mach = (2 / (gh - 1) * ((pOut / pAtm) ** ((gh - 1) / gh) - 1)) ** (
+                    1 / 2
+                )
+                coreChoked = 0.0
+            tt = tt * (pOut / pt) ** ((gh - 1) / gh)
+            pt = pOut
+            tExit = tt / (1 + (gh - 1) / 2 * mach ** 2)
+            pExit = pt / ((1 + (gh - 1) / 2 * mach ** 2) ** (gh / (gh - 1)))
+            vFinal = mach * (gh * rh * tExit) ** (0.5)
+            area = mdot / (pExit / (rh * tExit) * vFinal)
+            coreMomentum = mdot * vFinal - (mdot - mFuel) * v0
+            corePressure = area * (pExit - pAtm)
+            thrust += coreMomentum + corePressure
+
+    out[THRUST] = thrust
+    out[FUEL_FLOW] = mFuel
+    out[TSFC] = mFuel / thrust
+    out[CORE_MOMENTUM_THRUST] = coreMomentum
+    out[CORE_PRESSURE_THRUST] = corePressure
+    out[BYPASS_THRUST] = thrust - coreMomentum - corePressure
+    out[CORE_PRESSURE_RATIO] = pt / pAtm
+    out[BYPASS_PRESSURE_RATIO] = bypassRatio
+    out[CORE_CHOKED] = coreChoked
+    out[BYPASS_CHOKED] = bypassChoked
+
+
+def _evaluateBatch(operations, targets, inlets, parameters, work, out):
+    """
+    Simulates every row of inlets and parameters with the Python kernel. Rows are converted to lists first since
+    arithmetic on Python floats is much faster than on NumPy scalars.
+    """
+    operations = operations.tolist()
+    targets = targets.tolist()
+    work = work.tolist()
+    row = [0.0] * OUTPUTS
+    for i, (inlet, point) in enumerate(zip(inlets.tolist(), parameters.tolist())):
+        _evaluatePoint(operations, targets, inlet, point, work, row)
+        out[i] = row
+
+
+POINT_KERNELS = {"python": _evaluatePoint}
+BATCH_KERNELS = {"python": _evaluateBatch}
+
+if numba is not None:
+    _jitPoint = numba.njit(cache=True, nogil=True)(_evaluatePoint)
+
+    @numba.njit(cache=True, nogil=True)
+    def _jitBatch(operations, targets, inlets, parameters, work, out):
+        for i in range(inlets.shape[0]):
+            _jitPoint(operations, targets, inlets[i], parameters[i], work, out[i])
+
+    POINT_KERNELS["numba"] = _jitPoint
+    BATCH_KERNELS["numba"] = _jitBatch
+
+BACKENDS = list(BATCH_KERNELS.keys())
+
+
+def defaultBackend() -> str:
+    """
+    Returns numba when it is installed, python otherwise.
+    """
+    return BACKENDS[-1]
+
+
+class CompiledEngine:
+    """
+    A TurbineEngine lowered to arrays that can be evaluated at many operating points at once.
+    """
+
+    def __init__(this, engine, backend=None) -> None:
+        """
+        The engine must not have been simulated yet, since simulating changes its fluid in place.
+        Wrappers such as TripleSpoolNonMixingHighBypassTurbofanEngine are unwrapped.
+        """
+        engine = getattr(engine, "turboFanEngine", engine)
+        if engine.fluid.work:
+            raise ValueError("The engine must be compiled before it is simulated")
+        if backend is None:
+            backend = defaultBackend()
+        if backend not in BACKENDS:
+            raise ValueError("Unknown backend " + str(backend))
+        this.backend = backend
+        this.components = list(engine.engineComponents)
+        ids = [id(component) for component in this.components]
+        count = len(this.components)
+        this.operations = np.zeros(count, dtype=np.int64)
+        this.targets = np.full(count, -1, dtype=np.int64)
+        this.parameters = np.zeros((count, SLOTS))
+        for k, component in enumerate(this.components):
+            if type(component) not in OPERATIONS:
+                raise TypeError("Cannot compile a " + type(component).__name__)
+            operation, names = OPERATIONS[type(component)]
+            this.operations[k] = operation
+            for slot, name in enumerate(names):
+                this.parameters[k, slot] = getattr(component, name)
+            if operation == TURBINE:
+                if component.poweredComponentID not in ids[:k]:
+                    raise ValueError("A turbine must power a component upstream of it")
+                this.targets[k] = ids.index(component.poweredComponentID)
+        this.inlet = np.array(
+            [getattr(engine.fluid, name) for name in INLETS], dtype=float
+        )
+
+    def get_signature(this):
+        return tuple(zip(this.operations.tolist(), this.targets.tolist()))
+
+    signature = property(get_signature)
+
+    def parameterIndex(this, component, name: str) -> tuple:
+        """
+        Finds the (component index, slot) of a parameter. The component is either an index or a component object.
+        """
+        if not isinstance(component, int):
+            component = [id(c) for c in this.components].index(id(component))
+        names = OPERATIONS[type(this.components[component])][1]
+        return component, names.index(name)
+
+    def batch(this, count: int) -> tuple:
+        """
+        Returns (inlets, parameters) arrays holding count copies of the engine's design point, ready to be edited.
+        """
+        inlets = np.tile(this.inlet, (count, 1))
+        parameters = np.tile(this.parameters, (count, 1, 1))
+        return inlets, parameters
+
+    def assign(this, inlets, parameters, component, name: str, values) -> None:
+        """
+        Sets an inlet column when component is None, a component parameter otherwise.
+        """
+        if component is None:
+            inlets[:, INLETS.index(name)] = values
+        else:
+            k, slot = this.parameterIndex(component, name)
+            parameters[:, k, slot] = values
+
+    def evaluate(this, inlets, parameters, out=None):
+        """
+        Simulates every row of inlets (n, len(INLETS)) and parameters (n, components, SLOTS).
+        Returns an (n, OUTPUTS) array, written into out when it is given.
+        """
+        inlets = np.ascontiguousarray(inlets, dtype=float)
+        parameters = np.ascontiguousarray(parameters, dtype=float)
+        if out is None:
+            out = np.empty((inlets.shape[0], OUTPUTS))
+        work = np.zeros(len(this.components))
+        BATCH_KERNELS[this.backend](
+            this.operations, this.targets, inlets, parameters, work, out
+        )
+        return out
+
+    def simulate(this):
+        """
+        Simulates the design point only.
+        """
+        return this.evaluate(*this.batch(1))[0]
+
+
+def benchmark(compiled: CompiledEngine, count=100000, repeats=5) -> dict:
+    """
+    Times the first call, which includes any JIT compilation, separately from the steady-state throughput.
+    """
+    inlets, parameters = compiled.batch(count)
+    inlets[:, ALTITUDE] = np.linspace(0, 15000, count)
+    start = time.perf_counter()
+    compiled.evaluate(inlets[:1], parameters[:1])
+    warmup = time.perf_counter() - start
+    out = np.empty((count, OUTPUTS))
+    best = math.inf
+    for i in range(repeats):
+        start = time.perf_counter()
+        compiled.evaluate(inlets, parameters, out)
+        best = min(best, time.perf_counter() - start)
+    return {
+        "backend": compiled.backend,
+        "warmup": warmup,
+        "throughput": count / best,
+    }
+
+
+if __name__ == "__main__":
+    from turbineengine import TripleSpoolNonMixingHighBypassTurbofanEngine
+    from sweeps import SWEEPS, evaluateSweep, evaluateReferenceSweep
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the compiled engine kernels."
+    )
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    for backend in BACKENDS:
+        compiled = CompiledEngine(
+            TripleSpoolNonMixingHighBypassTurbofanEngine(), backend
+        )
+        result = benchmark(compiled, args.points, args.repeats)
+        # Check the kernel against the object model on every sweep of the study
+        error = 0.0
+        for parameter, values in SWEEPS.items():
+            compiled = evaluateSweep(parameter, values, backend)
+            reference = evaluateReferenceSweep(parameter, values)
+            for output, column in reference.items():
+                scale = np.maximum(np.abs(column), 1e-300)
+                error = max(error, np.max(np.abs(compiled[output] - column) / scale))
+        print(
+            backend
+            + ": warm-up "
+            + format(result["warmup"], ".3f")
+            + " s, "
+            + format(result["throughput"], ".4g")
+            + " points/s, max relative error "
+            + format(error, ".3g")
+        )
@@ -0,0 +1,201 @@
+from turbineengine import TripleSpoolNonMixingHighBypassTurbofanEngine
+from kernel import POINT_KERNELS, CompiledEngine
+import kernel
+import numpy as np
+import argparse
+import gc
+import time
+
+#   Real-Time Evaluation
+# For hardware-in-the-loop rigs the engine is stepped at a fixed rate. All state of the compiled engine is
+# allocated once, every step overwrites it in place, and the garbage collector is held off while running, so
+# a step's latency only depends on the kernel. Latencies and start jitter are recorded in preallocated
+# histograms to certify the deadline.
+
+# Histogram bins of 1 us, the last bin collects everything slower
+BIN = 1000
+BINS = 2000
+
+
+class RealTimeEngine:
+    """
+    An object that steps a compiled engine without allocating anything per step.
+    """
+
+    def __init__(this, engine, backend=None) -> None:
+        """
+        The Numba backend is needed for allocation free steps. The plain Python backend works but creates floats.
+        """
+        if not isinstance(engine, CompiledEngine):
+            engine = CompiledEngine(engine, backend)
+        this.compiled = engine
+        this.kernel = POINT_KERNELS[engine.backend]
+        this.operations = engine.operations.copy()
+        this.targets = engine.targets.copy()
+        this.inlet = engine.inlet.copy()
+        this.parameters = engine.parameters.copy()
+        this.work = np.zeros(len(this.operations))
+        this.out = np.zeros(kernel.OUTPUTS)
+        combustor = list(this.operations).index(kernel.COMBUSTOR)
+        this.combustor = this.parameters[combustor]
+        this.slot = engine.parameterIndex(combustor, "totalExitTemperature")[1]
+        this.latencies = np.zeros(BINS, dtype=np.int64)
+        this.jitters = np.zeros(BINS, dtype=np.int64)
+        # Compile and touch everything before the first timed step
+        this.step(
+            this.inlet[kernel.MACH_NUMBER],
+            this.inlet[kernel.ALTITUDE],
+            this.combustor[this.slot],
+        )
+
+    def step(this, mach: float, altitude: float, totalExitTemperature: float):
+        """
+        mach -> unitless | altitude -> m | totalExitTemperature -> K
+        Simulates one step in place. Returns the output buffer, which is overwritten by the next step, indexed by
+        the kernel columns, e.g. out[kernel.THRUST] and out[kernel.FUEL_FLOW].
+        """
+        this.inlet[kernel.MACH_NUMBER] = mach
+        this.inlet[kernel.ALTITUDE] = altitude
+        this.combustor[this.slot] = totalExitTemperature
+        this.kernel(
+            this.operations,
+            this.targets,
+            this.inlet,
+            this.parameters,
+            this.work,
+            this.out,
+        )
+        return this.out
+
+    def run(this, rate: float, seconds: float, mach, altitude, totalExitTemperature):
+        """
+        rate -> Hz | seconds -> s
+        Steps the engine at a fixed rate, busy waiting for each deadline. The inputs are either constants or sequences
+        that are cycled through, e.g. a recorded flight. Returns a dictionary describing the run, see printReport.
+        Objects alive at the start are frozen for the run and thawed after it, unless the caller had already frozen
+        objects with gc.freeze, which are then left frozen.
+        """
+        period = int(1e9 / rate)
+        count = int(rate * seconds)
+        inputs = [
+            [float(x) for x in np.atleast_1d(values)]
+            for values in (mach, altitude, totalExitTemperature)
+        ]
+        lengths = [len(values) for values in inputs]
+        this.latencies[:] = 0
+        this.jitters[:] = 0
+        latencies = this.latencies
+        jitters = this.jitters
+        worstLatency = 0
+        worstJitter = 0
+        misses = 0
+        clock = time.perf_counter_ns
+
+        enabled = gc.isenabled()
+        # gc.unfreeze would also thaw whatever the caller froze, e.g. before forking
+        frozen = gc.get_freeze_count() > 0
+        gc.collect()
+        collections = sum(stats["collections"] for stats in gc.get_stats())
+        if not frozen:
+            gc.freeze()
+        gc.disable()
+        try:
+            deadline = clock() + period
+            for i in range(count):
+                scheduled = deadline - period
+                while clock() < scheduled:
+                    pass
+                start = clock()
+                this.step(
+                    inputs[0][i % lengths[0]],
+                    inputs[1][i % lengths[1]],
+                    inputs[2][i % lengths[2]],
+                )
+                end = clock()
+                latency = end - start
+                jitter = start - scheduled
+                latencies[min(latency // BIN, BINS - 1)] += 1
+                jitters[min(jitter // BIN, BINS - 1)] += 1
+                if latency > worstLatency:
+                    worstLatency = latency
+                if jitter > worstJitter:
+                    worstJitter = jitter
+                if end > deadline:
+                    misses += 1
+                deadline += period
+        finally:
+            if enabled:
+                gc.enable()
+            if not frozen:
+                gc.unfreeze()
+        return {
+            "backend": this.compiled.backend,
+            "rate": rate,
+            "steps": count,
+            "deadline": period,
+            "latencies": latencies.copy(),
+            "jitters": jitters.copy(),
+            "worstLatency": worstLatency,
+            "worstJitter": worstJitter,
+            "misses": misses,
+            "collections": sum(stats["collections"] for stats in gc.get_stats())
+            - collections,
+        }
+
+
+def percentile(histogram, fraction: float) -> int:
+    """
+    Returns the upper edge, in ns, of the histogram bin holding the given fraction of the samples.
+    """
+    index = np.searchsorted(np.cumsum(histogram), fraction * histogram.sum())
+    return int(index + 1) * BIN
+
+
+def printReport(report: dict) -> None:
+    print(
+        "Backend "
+        + report["backend"]
+        + ", "
+        + str(report["steps"])
+        + " steps at "
+        + format(report["rate"], "g")
+        + " Hz, deadline "
+        + format(report["deadline"] / 1000, "g")
+        + " us"
+    )
+    for name, histogram, worst in [
+        ("Latency", report["latencies"], report["worstLatency"]),
+        ("Start jitter", report["jitters"], report["worstJitter"]),
+    ]:
+        print(
+            name
+            + " (us): p50 < "
+            + format(percentile(histogram, 0.5) / 1000, "g")
+            + ", p99 < "
+            + format(percentile(histogram, 0.99) / 1000, "g")
+            + ", p99.9 < "
+            + format(percentile(histogram, 0.999) / 1000, "g")
+            + ", worst "
+            + format(worst / 1000, ".3g")
+        )
+    print("Deadline misses: " + str(report["misses"]))
+    print("Garbage collections during the run: " + str(report["collections"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Certify the real-time step rate.")
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--backend", default=None, choices=kernel.BACKENDS)
+    args = parser.parse_args()
+
+    engine = RealTimeEngine(
+        TripleSpoolNonMixingHighBypassTurbofanEngine(), args.backend
+    )
+    # Climb through the tropopause while throttling up and down
+    steps = int(args.rate * 10)
+    phase = np.linspace(0, 2 * np.pi, steps)
+    altitudes = np.linspace(9000, 13000, steps)
+    temperatures = 1600 + 150 * np.sin(phase)
+    report = engine.run(args.rate, args.seconds, 0.84, altitudes, temperatures)
+    printReport(report)
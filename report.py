@@ -0,0 +1,152 @@
+from sweeps import FIGURES, SWEEPS, computeSweeps, plotFigure
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from multiprocessing import Pool
+import numpy as np
+import argparse
+import hashlib
+import html
+import json
+import os
+
+#   Headless Report of the Turbofan Study
+# The sweeps are computed once, then every figure is rendered with Agg in worker processes
+# Figures whose input data has not changed since the last run are skipped
+
+MANIFEST = "manifest.json"
+DATA = "data.npz"
+INDEX = "index.html"
+
+
+def hashFigure(figure: dict, results: dict) -> str:
+    """
+    Hashes the figure definition and the data of every series plotted in it.
+    """
+    digest = hashlib.sha256(json.dumps(figure, sort_keys=True).encode())
+    for sweep, output, label in figure["series"]:
+        digest.update(np.ascontiguousarray(results[sweep][sweep], float).tobytes())
+        digest.update(np.ascontiguousarray(results[sweep][output], float).tobytes())
+    return digest.hexdigest()
+
+
+def renderFigure(figure: dict, results: dict, directory: str, formats: list) -> str:
+    """
+    Renders one entry of FIGURES to a file per format without using pyplot, so no display is needed.
+    """
+    canvas = FigureCanvasAgg(Figure())
+    plotFigure(figure, results, canvas.figure.add_subplot(111))
+    for extension in formats:
+        canvas.figure.savefig(os.path.join(directory, figure["name"] + "." + extension))
+    return figure["name"]
+
+
+def writeData(results: dict, directory: str) -> None:
+    """
+    Dumps the raw sweep results to a single .npz archive keyed by sweep__output.
+    """
+    arrays = dict()
+    for sweep, columns in results.items():
+        for column, values in columns.items():
+            arrays[sweep + "__" + column] = values
+    np.savez(os.path.join(directory, DATA), **arrays)
+
+
+def writeIndex(directory: str, formats: list) -> None:
+    """
+    Writes an html page listing every figure of the report.
+    """
+    lines = [
+        "<!DOCTYPE html>",
+        "<html>",
+        "<head><meta charset='utf-8'><title>Turbofan Study</title></head>",
+        "<body>",
+        "<h1>Triple-Spool Non-Mixing High-Bypass Turbofan Engine</h1>",
+    ]
+    for figure in FIGURES:
+        name = html.escape(figure["name"])
+        lines.append("<h2>" + html.escape(figure["title"]) + "</h2>")
+        lines.append("<img src='" + name + "." + formats[0] + "'>")
+        links = [
+            "<a href='" + name + "." + ext + "'>" + ext + "</a>" for ext in formats
+        ]
+        lines.append("<p>" + " | ".join(links) + "</p>")
+    lines.append("<p><a href='" + DATA + "'>Raw data</a></p>")
+    lines.extend(["</body>", "</html>"])
+    with open(os.path.join(directory, INDEX), "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def isCurrent(
+    figure: dict, digest: str, manifest: dict, directory: str, formats: list
+) -> bool:
+    """
+    Checks whether the figure was already rendered from the same data in every format.
+    """
+    if manifest.get(figure["name"]) != digest:
+        return False
+    return all(
+        os.path.exists(os.path.join(directory, figure["name"] + "." + ext))
+        for ext in formats
+    )
+
+
+def generateReport(
+    directory="report", formats=("png", "svg"), processes=None, force=False
+) -> list:
+    """
+    Computes the sweeps, renders the changed figures in parallel and writes the index and raw data.
+    Returns the names of the figures that were rendered.
+    """
+    formats = list(formats)
+    os.makedirs(directory, exist_ok=True)
+    manifestPath = os.path.join(directory, MANIFEST)
+    manifest = dict()
+    if os.path.exists(manifestPath) and not force:
+        with open(manifestPath) as file:
+            manifest = json.load(file)
+
+    with Pool(processes) as pool:
+        results = computeSweeps(SWEEPS, pool)
+        digests = {figure["name"]: hashFigure(figure, results) for figure in FIGURES}
+        stale = [
+            figure
+            for figure in FIGURES
+            if not isCurrent(
+                figure, digests[figure["name"]], manifest, directory, formats
+            )
+        ]
+        # Only ship each worker the sweeps its figure plots
+        jobs = [
+            (
+                figure,
+                {s: results[s] for s, o, l in figure["series"]},
+                directory,
+                formats,
+            )
+            for figure in stale
+        ]
+        rendered = pool.starmap(renderFigure, jobs)
+
+    writeData(results, directory)
+    writeIndex(directory, formats)
+    with open(manifestPath, "w") as file:
+        json.dump(digests, file, indent=2, sort_keys=True)
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the turbofan study to files.")
+    parser.add_argument("directory", nargs="?", default="report")
+    parser.add_argument("--formats", nargs="+", default=["png", "svg"])
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="render every figure")
+    args = parser.parse_args()
+    rendered = generateReport(args.directory, args.formats, args.processes, args.force)
+    print(
+        "Rendered "
+        + str(len(rendered))
+        + " of "
+        + str(len(FIGURES))
+        + " figures to "
+        + args.directory
+    )
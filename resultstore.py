@@ -0,0 +1,129 @@
+import numpy as np
+import json
+import os
+
+#   Result Store
+# Sweep results live in a single file, a small JSON header followed by a structured array over the
+# whole grid in C order. The file is preallocated, so worker processes can write disjoint chunks of it
+# concurrently and later analysis reads it memory-mapped, only touching the pages it slices.
+
+MAGIC = b"RESULTS1"
+ALIGNMENT = 4096
+
+
+class ResultStore:
+    """
+    An object that gives access to a result store file. Use createStore or openStore to make one.
+    """
+
+    def __init__(this, path: str, mode="r") -> None:
+        """
+        mode -> "r" to read only | "r+" to also write chunks
+        """
+        this.path = path
+        this.mode = mode
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + " is not a result store")
+            length = int.from_bytes(file.read(8), "little")
+            header = json.loads(file.read(length).decode())
+        this.axes = {name: np.array(values) for name, values in header["axes"]}
+        this.dtype = np.dtype([tuple(field) for field in header["fields"]])
+        this.shape = tuple(len(values) for values in this.axes.values())
+        this.chunkSize = header["chunkSize"]
+        this.offset = header["offset"]
+        this.data = np.memmap(path, this.dtype, mode, this.offset, this.shape)
+
+    def get_size(this):
+        return int(np.prod(this.shape))
+
+    size = property(get_size)
+
+    def get_chunkCount(this):
+        return -(-this.size // this.chunkSize)
+
+    chunkCount = property(get_chunkCount)
+
+    def chunkRange(this, chunk: int) -> tuple:
+        """
+        Returns the (start, stop) flat indices of the grid points in chunk.
+        """
+        start = chunk * this.chunkSize
+        return start, min(start + this.chunkSize, this.size)
+
+    def chunkPoints(this, chunk: int) -> dict:
+        """
+        Returns the value of every axis at each grid point of chunk.
+        """
+        start, stop = this.chunkRange(chunk)
+        indices = np.unravel_index(np.arange(start, stop), this.shape)
+        return {
+            name: values[index]
+            for (name, values), index in zip(this.axes.items(), indices)
+        }
+
+    def writeChunk(this, chunk: int, values: dict) -> None:
+        """
+        Writes the fields of every point in chunk. Chunks are contiguous in the file and are written with a single
+        positioned write, so processes writing different chunks never touch each other's bytes. The write is synced
+        to disk before returning, so a chunk can be recorded as done as soon as this returns.
+        """
+        start, stop = this.chunkRange(chunk)
+        rows = np.zeros(stop - start, this.dtype)
+        for name, column in values.items():
+            rows[name] = column
+        descriptor = os.open(this.path, os.O_WRONLY)
+        try:
+            os.pwrite(
+                descriptor, rows.tobytes(), this.offset + start * this.dtype.itemsize
+            )
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def read(this, field=None, **selection):
+        """
+        Returns a memory-mapped view of the grid, selecting along axes by keyword, e.g. read("thrust", mach=3).
+        Nothing is loaded until the view is used, and then only the pages it covers.
+        """
+        index = tuple(selection.pop(name, slice(None)) for name in this.axes)
+        if selection:
+            raise KeyError("Unknown axes " + ", ".join(selection))
+        data = this.data if field is None else this.data[field]
+        return data[index]
+
+    def close(this) -> None:
+        if this.mode != "r":
+            this.data.flush()
+        del this.data
+
+
+def createStore(path: str, axes: dict, fields: list, chunkSize=4096) -> ResultStore:
+    """
+    Preallocates a store for the grid spanned by axes, a dictionary of axis name -> values, holding fields, a list
+    of (name, dtype). The file is sized up front but left sparse, so creating a large store is instant.
+    """
+    axes = {name: np.asarray(values).tolist() for name, values in axes.items()}
+    dtype = np.dtype(fields)
+    header = {
+        "axes": list(axes.items()),
+        "fields": [[name, dtype.fields[name][0].str] for name in dtype.names],
+        "chunkSize": chunkSize,
+        "offset": 0,
+    }
+    # The offset depends on the header length, so size it before filling it in
+    length = len(json.dumps(header).encode()) + 32
+    header["offset"] = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+    text = json.dumps(header).encode().ljust(length)
+    size = int(np.prod([len(values) for values in axes.values()]))
+    with open(path, "wb") as file:
+        file.write(MAGIC + len(text).to_bytes(8, "little") + text)
+        file.truncate(header["offset"] + size * dtype.itemsize)
+    return ResultStore(path, "r+")
+
+
+def openStore(path: str, mode="r") -> ResultStore:
+    """
+    Opens an existing store, read only by default.
+    """
+    return ResultStore(path, mode)
@@ -0,0 +1,288 @@
+from turbineengine import TripleSpoolNonMixingHighBypassTurbofanEngine
+from kernel import CompiledEngine
+from resultstore import createStore, openStore
+import kernel
+from itertools import starmap
+import numpy as np
+
+#   Parameter sweeps of the Triple-Spool Non-Mixing High-Bypass Turbofan Engine
+# Each sweep varies one keyword argument of the engine and keeps the rest at their defaults
+SWEEPS = {
+    "bypassRatio": np.arange(0, 10, 0.1),
+    "mach": np.arange(0.7, 0.9, 0.01),
+    "altitude": np.arange(7000, 15000, 100),
+    "lFanPressureRatio": np.arange(1.1, 2.1, 0.01),
+    "iCompPressureRatio": np.arange(1, 10, 0.1),
+    "lFanEfficiency": np.arange(0.7, 0.95, 0.01),
+    "hCompEfficiency": np.arange(0.7, 0.95, 0.01),
+    "lTurbineEfficiency": np.arange(0.8, 0.98, 0.01),
+    "hTurbineEfficiency": np.arange(0.8, 0.98, 0.01),
+}
+
+# Where each keyword of the engine lands in the compiled engine
+# Inlet conditions have no component, the rest are (component index, parameter)
+SWEEP_PARAMETERS = {
+    "bypassRatio": (1, "bypassRatio"),
+    "mach": (None, "machNumber"),
+    "altitude": (None, "altitude"),
+    "lFanPressureRatio": (1, "pressureRatio"),
+    "iCompPressureRatio": (2, "pressureRatio"),
+    "lFanEfficiency": (1, "efficiency"),
+    "hCompEfficiency": (3, "efficiency"),
+    "hTurbineEfficiency": (5, "efficiency"),
+    "lTurbineEfficiency": (7, "efficiency"),
+}
+
+# The quantities recorded at every point of every sweep
+OUTPUTS = [
+    "thrust",
+    "tsfc",
+    "corePressureRatio",
+    "bypassPressureRatio",
+    "coreMomentumThrust",
+    "corePressureThrust",
+    "bypassThrust",
+]
+
+THRUST = "Thrust (kN)"
+TSFC = "TSFC (mg/(N.s)"
+
+# The figures of the study, in the order of the README
+# Each series is (sweep, output, label)
+FIGURES = [
+    {
+        "name": "thrust_v_bypass_ratio",
+        "title": "Thrust v Bypass Ratio",
+        "xlabel": "Bypass Ratio",
+        "ylabel": THRUST,
+        "series": [("bypassRatio", "thrust", None)],
+    },
+    {
+        "name": "tsfc_v_bypass_ratio",
+        "title": "Fuel Consumption v Bypass Ratio",
+        "xlabel": "Bypass Ratio",
+        "ylabel": TSFC,
+        "series": [("bypassRatio", "tsfc", None)],
+    },
+    {
+        "name": "thrust_v_mach",
+        "title": "Thrust v Mach Number",
+        "xlabel": "M",
+        "ylabel": THRUST,
+        "series": [("mach", "thrust", None)],
+    },
+    {
+        "name": "tsfc_v_mach",
+        "title": "Fuel Consumption v Mach Number",
+        "xlabel": "M",
+        "ylabel": TSFC,
+        "series": [("mach", "tsfc", None)],
+    },
+    {
+        "name": "thrust_v_altitude",
+        "title": "Thrust v Altitude",
+        "xlabel": "Altitude (m)",
+        "ylabel": THRUST,
+        "series": [("altitude", "thrust", None)],
+    },
+    {
+        "name": "tsfc_v_altitude",
+        "title": "Fuel Consumption v Altitude",
+        "xlabel": "Altitude (m)",
+        "ylabel": TSFC,
+        "series": [("altitude", "tsfc", None)],
+    },
+    {
+        "name": "pressure_ratio_v_altitude",
+        "title": "Pressure Ratio v Altitude",
+        "xlabel": "Altitude (m)",
+        "ylabel": "Pressure Ratio",
+        "series": [
+            ("altitude", "corePressureRatio", "Core"),
+            ("altitude", "bypassPressureRatio", "Bypass"),
+        ],
+    },
+    {
+        "name": "momentum_thrust_v_altitude",
+        "title": "Momentum Thrust v Altitude",
+        "xlabel": "Altitude (m)",
+        "ylabel": THRUST,
+        "series": [
+            ("altitude", "coreMomentumThrust", "Core Momentum"),
+            ("altitude", "corePressureThrust", "Core Pressure"),
+            ("altitude", "bypassThrust", "Bypass"),
+            ("altitude", "thrust", "Total"),
+        ],
+    },
+    {
+        "name": "thrust_v_pressure_ratio",
+        "title": "Thrust v Pressure Ratio",
+        "xlabel": "Pressure Ratio",
+        "ylabel": THRUST,
+        "series": [
+            ("lFanPressureRatio", "thrust", "LPC"),
+            ("iCompPressureRatio", "thrust", "IPC"),
+        ],
+    },
+    {
+        "name": "tsfc_v_pressure_ratio",
+        "title": "Fuel Consumption v Pressure Ratio",
+        "xlabel": "Pressure Ratio",
+        "ylabel": TSFC,
+        "series": [
+            ("lFanPressureRatio", "tsfc", "LPC"),
+            ("iCompPressureRatio", "tsfc", "IPC"),
+        ],
+    },
+    {
+        "name": "thrust_v_compressor_efficiency",
+        "title": "Thrust v Efficiency",
+        "xlabel": "Efficiency",
+        "ylabel": THRUST,
+        "series": [
+            ("lFanEfficiency", "thrust", "LPC"),
+            ("hCompEfficiency", "thrust", "HPC"),
+        ],
+    },
+    {
+        "name": "tsfc_v_compressor_efficiency",
+        "title": "Fuel Consumption v Efficiency",
+        "xlabel": "Efficiency",
+        "ylabel": TSFC,
+        "series": [
+            ("lFanEfficiency", "tsfc", "LPC"),
+            ("hCompEfficiency", "tsfc", "HPC"),
+        ],
+    },
+    {
+        "name": "thrust_v_turbine_efficiency",
+        "title": "Thrust v Efficiency",
+        "xlabel": "Efficiency",
+        "ylabel": THRUST,
+        "series": [
+            ("lTurbineEfficiency", "thrust", "LPT"),
+            ("hTurbineEfficiency", "thrust", "HPT"),
+        ],
+    },
+    {
+        "name": "tsfc_v_turbine_efficiency",
+        "title": "Fuel Consumption v Efficiency",
+        "xlabel": "Efficiency",
+        "ylabel": TSFC,
+        "series": [
+            ("lTurbineEfficiency", "tsfc", "LPT"),
+            ("hTurbineEfficiency", "tsfc", "HPT"),
+        ],
+    },
+]
+
+
+def evaluatePoint(parameter: str, value: float) -> list:
+    """
+    Simulates the engine object model with one parameter changed and returns the OUTPUTS in plotting units.
+    """
+    engine = TripleSpoolNonMixingHighBypassTurbofanEngine(**{parameter: value})
+    engine = engine.simulate()
+    bypassThrust = engine.thrust - engine.coreMomentumThrust - engine.corePressureThrust
+    return [
+        engine.thrust / 1000,
+        engine.thrustSpecificFuelConsumption * 10 ** 6,
+        engine.fluid.totalPressure / engine.fluid.atmosphericPressure,
+        engine.engineComponents[1].totalPressureBypass
+        / engine.fluid.atmosphericPressure,
+        engine.coreMomentumThrust / 1000,
+        engine.corePressureThrust / 1000,
+        bypassThrust / 1000,
+    ]
+
+
+def evaluateReferenceSweep(parameter: str, values) -> dict:
+    """
+    Evaluates a sweep point by point through the engine object model, to check the compiled kernel against.
+    """
+    rows = np.array([evaluatePoint(parameter, value) for value in values])
+    results = {parameter: np.asarray(values)}
+    for i, output in enumerate(OUTPUTS):
+        results[output] = rows[:, i]
+    return results
+
+
+def evaluateSweep(parameter: str, values, backend=None) -> dict:
+    """
+    Evaluates every point of a sweep in one call of the compiled kernel.
+    Returns a dictionary of arrays keyed by the parameter and the OUTPUTS.
+    """
+    compiled = CompiledEngine(TripleSpoolNonMixingHighBypassTurbofanEngine(), backend)
+    inlets, parameters = compiled.batch(len(values))
+    compiled.assign(inlets, parameters, *SWEEP_PARAMETERS[parameter], values)
+    results = toOutputs(compiled.evaluate(inlets, parameters))
+    results[parameter] = np.asarray(values)
+    return results
+
+
+def toOutputs(out) -> dict:
+    """
+    Converts rows of kernel outputs to a dictionary of the OUTPUTS in plotting units.
+    """
+    return {
+        "thrust": out[:, kernel.THRUST] / 1000,
+        "tsfc": out[:, kernel.TSFC] * 10 ** 6,
+        "corePressureRatio": out[:, kernel.CORE_PRESSURE_RATIO],
+        "bypassPressureRatio": out[:, kernel.BYPASS_PRESSURE_RATIO],
+        "coreMomentumThrust": out[:, kernel.CORE_MOMENTUM_THRUST] / 1000,
+        "corePressureThrust": out[:, kernel.CORE_PRESSURE_THRUST] / 1000,
+        "bypassThrust": out[:, kernel.BYPASS_THRUST] / 1000,
+    }
+
+
+def evaluateChunk(path: str, chunk: int, backend=None) -> int:
+    """
+    Evaluates one chunk of a grid store, where every axis of the store is a keyword of SWEEP_PARAMETERS.
+    Returns the number of points evaluated.
+    """
+    store = openStore(path)
+    points = store.chunkPoints(chunk)
+    compiled = CompiledEngine(TripleSpoolNonMixingHighBypassTurbofanEngine(), backend)
+    count = len(next(iter(points.values())))
+    inlets, parameters = compiled.batch(count)
+    for parameter, values in points.items():
+        compiled.assign(inlets, parameters, *SWEEP_PARAMETERS[parameter], values)
+    store.writeChunk(chunk, toOutputs(compiled.evaluate(inlets, parameters)))
+    store.close()
+    return count
+
+
+def evaluateGrid(path: str, axes: dict, pool=None, chunkSize=4096):
+    """
+    Evaluates the full grid spanned by axes, a dictionary of SWEEP_PARAMETERS keyword -> values, into a result
+    store at path. Chunks are spread across the worker processes of pool, each writing its own part of the file.
+    """
+    createStore(path, axes, [(output, "f8") for output in OUTPUTS], chunkSize).close()
+    store = openStore(path)
+    mapper = starmap if pool is None else pool.starmap
+    list(mapper(evaluateChunk, [(path, chunk) for chunk in range(store.chunkCount)]))
+    return store
+
+
+def computeSweeps(sweeps=SWEEPS, pool=None) -> dict:
+    """
+    Evaluates every sweep once, optionally across the worker processes of pool.
+    """
+    mapper = starmap if pool is None else pool.starmap
+    results = mapper(evaluateSweep, sweeps.items())
+    return dict(zip(sweeps.keys(), results))
+
+
+def plotFigure(figure: dict, results: dict, axes) -> None:
+    """
+    Draws one entry of FIGURES onto axes using the results of computeSweeps.
+    """
+    legend = False
+    for sweep, output, label in figure["series"]:
+        axes.plot(results[sweep][sweep], results[sweep][output], label=label)
+        legend = legend or label is not None
+    axes.set_xlabel(figure["xlabel"])
+    axes.set_ylabel(figure["ylabel"])
+    if legend:
+        axes.legend()
+    axes.grid()
@@ -0,0 +1,355 @@
+from sweeps import OUTPUTS, SWEEP_PARAMETERS, evaluateChunk
+from resultstore import createStore, openStore
+from multiprocessing import Process
+import numpy as np
+import argparse
+import os
+import socket
+import sqlite3
+import time
+
+#   Resumable Grid Sweeps
+# A grid sweep lives in a directory holding its result store and an SQLite work queue with one unit per chunk.
+# Any number of worker processes, on any nodes that share the directory, claim units, write their chunk and
+# mark it done. Claims expire after a lease, so the units of a crashed or preempted worker are picked up again,
+# while done units are never recomputed. A unit that has been claimed maxAttempts times without being finished
+# is marked failed instead of being claimed again, so one bad chunk cannot hold up the sweep forever.
+# No broker is needed, only the shared filesystem.
+
+STORE = "results.store"
+QUEUE = "queue.sqlite"
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+
+def connect(directory: str) -> sqlite3.Connection:
+    """
+    Opens the work queue of a sweep directory. Transactions are managed explicitly.
+    """
+    connection = sqlite3.connect(
+        os.path.join(directory, QUEUE), timeout=60, isolation_level=None
+    )
+    connection.execute("PRAGMA busy_timeout = 60000")
+    return connection
+
+
+def createSweep(directory: str, axes: dict, chunkSize=4096) -> int:
+    """
+    Preallocates the result store of the grid spanned by axes and queues one unit per chunk.
+    An existing sweep in directory is left as it is, so this is safe to call again on restart, but raises ValueError
+    if its axes or chunk size differ from the ones given. Returns the number of units.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, QUEUE)):
+        store = openStore(os.path.join(directory, STORE))
+        same = store.chunkSize == chunkSize and list(store.axes) == list(axes)
+        same = same and all(
+            np.array_equal(store.axes[name], np.asarray(values, dtype=float))
+            for name, values in axes.items()
+        )
+        store.close()
+        if not same:
+            raise ValueError(
+                "The sweep in " + directory + " has different axes or chunk size"
+            )
+        return store.chunkCount
+    for parameter in axes:
+        if parameter not in SWEEP_PARAMETERS:
+            raise KeyError("Unknown sweep parameter " + parameter)
+    store = createStore(
+        os.path.join(directory, STORE),
+        axes,
+        [(output, "f8") for output in OUTPUTS],
+        chunkSize,
+    )
+    store.close()
+    # Build the queue under a temporary name so a half-made queue is never picked up
+    temporary = os.path.join(directory, QUEUE + ".tmp")
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary)
+    connection.executescript(
+        """
+        CREATE TABLE units (
+            chunk INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            worker TEXT,
+            claimed REAL,
+            finished REAL,
+            points INTEGER,
+            attempts INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX unitsByState ON units (state);
+        CREATE TABLE workers (
+            worker TEXT PRIMARY KEY,
+            started REAL,
+            heartbeat REAL,
+            units INTEGER NOT NULL DEFAULT 0,
+            points INTEGER NOT NULL DEFAULT 0,
+            busy REAL NOT NULL DEFAULT 0
+        );
+        """
+    )
+    connection.executemany(
+        "INSERT INTO units (chunk, state) VALUES (?, ?)",
+        [(chunk, PENDING) for chunk in range(store.chunkCount)],
+    )
+    connection.commit()
+    connection.close()
+    os.replace(temporary, os.path.join(directory, QUEUE))
+    return store.chunkCount
+
+
+def claimUnit(connection: sqlite3.Connection, worker: str, lease: float, maxAttempts=3):
+    """
+    Claims the next pending unit, or a unit whose claim is older than lease seconds.
+    Units whose claim expired after maxAttempts claims are marked failed instead of being claimed again.
+    Returns the chunk of the unit, or None when there is nothing left to claim.
+    """
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "UPDATE units SET state = ? WHERE state = ? AND claimed < ? AND attempts >= ?",
+            (FAILED, CLAIMED, now - lease, maxAttempts),
+        )
+        row = connection.execute(
+            "SELECT chunk FROM units WHERE state = ? OR (state = ? AND claimed < ?) "
+            "ORDER BY chunk LIMIT 1",
+            (PENDING, CLAIMED, now - lease),
+        ).fetchone()
+        if row is not None:
+            connection.execute(
+                "UPDATE units SET state = ?, worker = ?, claimed = ?, attempts = attempts + 1 "
+                "WHERE chunk = ?",
+                (CLAIMED, worker, now, row[0]),
+            )
+        connection.execute(
+            "UPDATE workers SET heartbeat = ? WHERE worker = ?", (now, worker)
+        )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return None if row is None else row[0]
+
+
+def finishUnit(
+    connection: sqlite3.Connection, worker: str, chunk: int, points: int, busy: float
+) -> bool:
+    """
+    Marks a unit done once its chunk is on disk and credits the worker with it. A worker whose lease expired and
+    whose unit was claimed by another worker gets no credit, the unit is left to the new claim.
+    Returns whether the unit was marked done by this worker.
+    """
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        finished = connection.execute(
+            "UPDATE units SET state = ?, finished = ?, points = ? "
+            "WHERE chunk = ? AND state = ? AND worker = ?",
+            (DONE, now, points, chunk, CLAIMED, worker),
+        ).rowcount
+        if finished == 1:
+            connection.execute(
+                "UPDATE workers SET heartbeat = ?, units = units + 1, points = points + ?, "
+                "busy = busy + ? WHERE worker = ?",
+                (now, points, busy, worker),
+            )
+        else:
+            connection.execute(
+                "UPDATE workers SET heartbeat = ? WHERE worker = ?", (now, worker)
+            )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return finished == 1
+
+
+def releaseUnit(
+    connection: sqlite3.Connection, worker: str, chunk: int, maxAttempts=3
+) -> None:
+    """
+    Gives up the claim of a unit whose evaluation raised, so it is retried without waiting for the lease to expire.
+    The unit is marked failed once it has been claimed maxAttempts times.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "UPDATE units SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL "
+            "WHERE chunk = ? AND state = ? AND worker = ?",
+            (maxAttempts, FAILED, PENDING, chunk, CLAIMED, worker),
+        )
+        connection.execute(
+            "UPDATE workers SET heartbeat = ? WHERE worker = ?", (time.time(), worker)
+        )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+
+
+def work(directory: str, lease=600.0, backend=None, maxAttempts=3) -> int:
+    """
+    Evaluates units of the sweep in directory until none are left to claim.
+    lease should comfortably exceed the time one unit takes. A unit whose evaluation raises is released for another
+    attempt, or marked failed after maxAttempts. Returns the number of units done by this worker.
+    """
+    worker = socket.gethostname() + ":" + str(os.getpid())
+    connection = connect(directory)
+    now = time.time()
+    connection.execute(
+        "INSERT OR IGNORE INTO workers (worker, started, heartbeat) VALUES (?, ?, ?)",
+        (worker, now, now),
+    )
+    path = os.path.join(directory, STORE)
+    done = 0
+    while True:
+        chunk = claimUnit(connection, worker, lease, maxAttempts)
+        if chunk is None:
+            break
+        start = time.perf_counter()
+        try:
+            points = evaluateChunk(path, chunk, backend)
+        except Exception as error:
+            print("Chunk " + str(chunk) + " failed on " + worker + ": " + repr(error))
+            releaseUnit(connection, worker, chunk, maxAttempts)
+            continue
+        if finishUnit(connection, worker, chunk, points, time.perf_counter() - start):
+            done += 1
+    connection.close()
+    return done
+
+
+def status(directory: str) -> dict:
+    """
+    Summarizes the progress of the sweep in directory and the throughput of every worker that has taken part.
+    """
+    connection = connect(directory)
+    counts = dict(
+        connection.execute(
+            "SELECT state, COUNT(*) FROM units GROUP BY state"
+        ).fetchall()
+    )
+    points, first, last = connection.execute(
+        "SELECT SUM(points), MIN(claimed), MAX(finished) FROM units WHERE state = ?",
+        (DONE,),
+    ).fetchone()
+    workers = connection.execute(
+        "SELECT worker, units, points, busy, heartbeat FROM workers ORDER BY worker"
+    ).fetchall()
+    connection.close()
+    return {
+        "units": sum(counts.values()),
+        PENDING: counts.get(PENDING, 0),
+        CLAIMED: counts.get(CLAIMED, 0),
+        DONE: counts.get(DONE, 0),
+        FAILED: counts.get(FAILED, 0),
+        "points": points or 0,
+        "elapsed": (last - first) if points else 0.0,
+        "workers": [
+            {
+                "worker": worker,
+                "units": units,
+                "points": count,
+                "throughput": count / busy if busy else 0.0,
+                "heartbeat": heartbeat,
+            }
+            for worker, units, count, busy, heartbeat in workers
+        ],
+    }
+
+
+def printStatus(directory: str) -> None:
+    summary = status(directory)
+    print(
+        str(summary[DONE])
+        + " of "
+        + str(summary["units"])
+        + " units done ("
+        + format(100 * summary[DONE] / max(summary["units"], 1), ".1f")
+        + "%), "
+        + str(summary[CLAIMED])
+        + " claimed, "
+        + str(summary[PENDING])
+        + " pending, "
+        + str(summary[FAILED])
+        + " failed"
+    )
+    if summary["elapsed"] > 0:
+        print(
+            "Overall: "
+            + format(summary["points"] / summary["elapsed"], ".4g")
+            + " points/s"
+        )
+    now = time.time()
+    for worker in summary["workers"]:
+        print(
+            worker["worker"]
+            + ": "
+            + str(worker["units"])
+            + " units, "
+            + str(worker["points"])
+            + " points, "
+            + format(worker["throughput"], ".4g")
+            + " points/s, last seen "
+            + format(now - worker["heartbeat"], ".0f")
+            + " s ago"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a resumable grid sweep.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser(
+        "create", help="preallocate a sweep and queue its units"
+    )
+    create.add_argument("directory")
+    create.add_argument(
+        "--axis",
+        nargs=4,
+        action="append",
+        required=True,
+        metavar=("PARAMETER", "START", "STOP", "STEP"),
+        help="an axis of the grid, as np.arange(START, STOP, STEP)",
+    )
+    create.add_argument("--chunk", type=int, default=4096, help="points per unit")
+    worker = commands.add_parser("work", help="evaluate units until none are left")
+    worker.add_argument("directory")
+    worker.add_argument("--processes", type=int, default=os.cpu_count())
+    worker.add_argument("--lease", type=float, default=600.0)
+    worker.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="claims of a unit before it is marked failed",
+    )
+    report = commands.add_parser("status", help="show progress and throughput")
+    report.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        axes = {
+            name: np.arange(float(start), float(stop), float(step))
+            for name, start, stop, step in args.axis
+        }
+        print(str(createSweep(args.directory, axes, args.chunk)) + " units")
+    elif args.command == "work":
+        processes = [
+            Process(
+                target=work,
+                args=(args.directory, args.lease, None, args.max_attempts),
+            )
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        printStatus(args.directory)
+    else:
+        printStatus(args.directory)